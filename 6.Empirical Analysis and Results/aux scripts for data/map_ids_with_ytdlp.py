@@ -4,7 +4,8 @@ Map each YouTube-ID-named folder under 08_inference_results/ to its video date
 using yt-dlp *with browser cookies* – no YouTube API key required.
 """
 
-import os, csv, sys, pathlib, boto3, re
+import os, csv, sys, pathlib, boto3, re, shelve, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dateutil import tz
 from tabulate import tabulate
@@ -18,20 +19,23 @@ S3_BUCKET   = "fomcthesiss3"
 S3_PREFIX   = "fomc_analysis/08_inference_results/"
 COOKIE_FILE = "/home/ubuntu/youtube.txt"   # <── your uploaded file
 CSV_OUT     = "fomc_video_dates.csv"
+CACHE_DB    = "yt_date_cache.db"   # shelve: video_id -> ISO date (immutable)
+MAX_INFLIGHT = 3        # hard cap on simultaneous YouTube requests (keep 2–4 with cookies)
+MAX_WORKERS = MAX_INFLIGHT   # one lookup thread per request slot; more would only wait on the gate
 # ─────────────────────────────────────────────────────────────────── #
 
 def list_ids_local(base):
     return sorted([p.name for p in pathlib.Path(base).iterdir() if p.is_dir()])
 
 def list_ids_s3(bucket, prefix):
+    """Yield IDs page by page so lookups can start before listing finishes."""
     s3 = boto3.client("s3")
     paginator = s3.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/")
-    ids = []
+    pages = paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/",
+                               PaginationConfig={"PageSize": 1000})
     for page in pages:
-        ids += [cp["Prefix"].split("/")[-2]          # last non-empty token
-                for cp in page.get("CommonPrefixes", [])]
-    return sorted(ids)
+        for cp in page.get("CommonPrefixes", []):
+            yield cp["Prefix"].split("/")[-2]          # last non-empty token
 
 def fetch_date(video_id, ydl):
     """Return ISO date string (YYYY-MM-DD) or 'unknown'."""
@@ -54,28 +58,75 @@ def fetch_date(video_id, ydl):
 
     return "unknown"
 
+YDL_OPTS = {
+    "cookiefile": COOKIE_FILE,
+    "skip_download": True,
+    "quiet": True,
+}
+
+_tls  = threading.local()
+_gate = threading.BoundedSemaphore(MAX_INFLIGHT)
+
+def _thread_ydl():
+    """One YoutubeDL per worker thread (instances are not thread-safe)."""
+    ydl = getattr(_tls, "ydl", None)
+    if ydl is None:
+        ydl = _tls.ydl = YoutubeDL(YDL_OPTS)
+    return ydl
+
+def seed_cache(cache, csv_path):
+    """Pre-fill the cache from a previous run's CSV (ignores 'unknown')."""
+    if not pathlib.Path(csv_path).is_file():
+        return
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            d = row.get("meeting_date")
+            if d and d != "unknown" and row["video_id"] not in cache:
+                cache[row["video_id"]] = d
+
+def fetch_row(video_id):
+    with _gate:                                  # be gentle with YouTube
+        return video_id, fetch_date(video_id, _thread_ydl())
+
 def main():
     # verify cookiefile exists
     if not pathlib.Path(COOKIE_FILE).is_file():
         sys.exit(f"Cookie file not found: {COOKIE_FILE}")
 
     if MODE == "local":
-        video_ids = list_ids_local(LOCAL_DIR)
+        id_source = list_ids_local(LOCAL_DIR)
     elif MODE == "s3":
-        video_ids = list_ids_s3(S3_BUCKET, S3_PREFIX)
+        id_source = list_ids_s3(S3_BUCKET, S3_PREFIX)
     else:
         sys.exit("MODE must be 'local' or 's3'")
 
-    if not video_ids:
-        sys.exit("No video-ID folders found for the given prefix.")
-
-    ydl = YoutubeDL({
-        "cookiefile": COOKIE_FILE,
-        "skip_download": True,
-        "quiet": True,
-    })
-
-    rows = [(vid, fetch_date(vid, ydl)) for vid in video_ids]
+    with shelve.open(CACHE_DB) as cache:
+        seed_cache(cache, CSV_OUT)
+
+        video_ids = []
+        def pending():
+            # consumed by ex.map() → each miss is submitted as soon as listed
+            for vid in id_source:
+                video_ids.append(vid)
+                if vid not in cache:
+                    yield vid
+
+        # network-bound → overlap the round-trips; store each date as it
+        # arrives so a rate-limit block can be resumed from where it stopped
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            for vid, d in ex.map(fetch_row, pending()):
+                fetched[vid] = d
+                if d != "unknown":
+                    cache[vid] = d
+
+        if not video_ids:
+            sys.exit("No video-ID folders found for the given prefix.")
+        print(f"cache: {len(video_ids) - len(fetched)} hits, {len(fetched)} fetched")
+
+        video_ids.sort()
+        rows = [(vid, cache[vid] if vid in cache else fetched[vid])
+                for vid in video_ids]
 
     # write CSV
     with open(CSV_OUT, "w", newline="") as f:
@@ -4,8 +4,9 @@ Download CME futures ticks for each FOMC meeting day listed in
 fomc_video_dates.csv and upload them to S3.
 """
 
-import os, sys, csv, pathlib, boto3, databento as db
-import pandas as pd
+import os, sys, csv, time, pathlib, tempfile, threading, boto3, databento as db
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 
 # ── CONFIG ────────────────────────────────────────────────────────── #
 BUCKET   = "fomcthesiss3"
@@ -16,52 +17,80 @@ SCHEMA   = "trades"
 START_HH = "08:30:00"      # UTC
 END_HH   = "22:00:00"      # UTC
 CSV_MAP  = "fomc_video_dates.csv"
+WORKERS  = 4               # (sym, day) tasks in flight
+DB_SLOTS = 2               # concurrent Databento requests
+MAX_429  = 5               # retries on HTTP 429 before giving up
 # ──────────────────────────────────────────────────────────────────── #
 
-s3      = boto3.client("s3")
+s3      = boto3.client("s3")           # thread-safe, shared by workers
 client  = db.Historical(os.environ["DATABENTO_API_KEY"])
+db_gate = threading.Semaphore(DB_SLOTS)
 
 def s3_key(sym, day):
     root = sym.split(".")[0]                   # ES or TU
     fname = f"{day}_{root}_{SCHEMA}.parquet"
     return f"{PREFIX}/{root}/date={day}/{fname}"
 
-def already_uploaded(key):
-    try:
-        s3.head_object(Bucket=BUCKET, Key=key)
-        return True
-    except s3.exceptions.ClientError:
-        return False
+def existing_keys(roots):
+    """Every key already under PREFIX/<root>/ — one paginated LIST per root."""
+    keys = set()
+    paginator = s3.get_paginator("list_objects_v2")
+    for root in roots:
+        for page in paginator.paginate(Bucket=BUCKET, Prefix=f"{PREFIX}/{root}/"):
+            keys.update(obj["Key"] for obj in page.get("Contents", []))
+    return keys
 
-def fetch_and_upload(sym, day):
+def fetch_and_upload(sym, day, uploaded):
     key = s3_key(sym, day)
-    if already_uploaded(key):
+    if key in uploaded:
         print(f"↷  Skip {sym} {day} (already in S3)")
         return
 
     start = f"{day}T{START_HH}Z"
     end   = f"{day}T{END_HH}Z"
-    print(f"⇩  Pulling {sym} {day} … ", end="", flush=True)
+    print(f"⇩  Pulling {sym} {day} …", flush=True)
 
-    resp = client.timeseries.get_range(
-        dataset   = DATASET,
-        symbols   = SYM,
-        stype_in  = "parent",
-        schema    = SCHEMA,
-        start     = start,
-        end       = end,
-        format    = "parquet",    # ← works on v0.14
-        compression = "zstd",
-    )
+    resp = get_range(sym, start, end)
 
-    df = resp.to_df()
-    if df.empty:
-        print("no rows — skipped")
+    n = upload_parquet(resp, key)
+    if not n:
+        print(f"   {sym} {day}: no rows — skipped")
         return
+    print(f"   {sym} {day}: {n:,} rows → s3://{BUCKET}/{key}")
 
-    s3_uri = f"s3://{BUCKET}/{key}"
-    df.to_parquet(s3_uri, index=False, compression="zstd")
-    print(f"{len(df):,} rows → {s3_uri}")
+def upload_parquet(resp, key):
+    """DBN → local Parquet (written in chunks, no full DataFrame) → S3.
+    Returns the row count; nothing is uploaded when it is 0."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, os.path.basename(key))
+        resp.to_parquet(path, compression="zstd")
+        n = pq.ParquetFile(path).metadata.num_rows
+        if n:
+            s3.upload_file(path, BUCKET, key)
+    return n
+
+def get_range(sym, start, end):
+    """Databento request, gated to DB_SLOTS at a time; backs off on HTTP 429."""
+    for attempt in range(MAX_429 + 1):
+        try:
+            with db_gate:
+                return client.timeseries.get_range(
+                    dataset   = DATASET,
+                    symbols   = sym,
+                    stype_in  = "parent",
+                    schema    = SCHEMA,
+                    start     = start,
+                    end       = end,
+                    format    = "parquet",    # ← works on v0.14
+                    compression = "zstd",
+                )
+        except db.BentoClientError as e:
+            if getattr(e, "http_status", None) != 429 or attempt == MAX_429:
+                raise
+            headers = getattr(e, "headers", None) or {}
+            wait = float(headers.get("Retry-After", 2 ** attempt))
+            print(f"   429 on {sym} {start[:10]} — retrying in {wait:.0f}s")
+            time.sleep(wait)
 
 def main():
     dates = [
@@ -71,9 +100,14 @@ def main():
     if not dates:
         sys.exit("No dates found in mapping CSV.")
 
-    for day in sorted(set(dates)):
-        for sym in SYMS:
-            fetch_and_upload(sym, day)
+    uploaded = existing_keys({sym.split(".")[0] for sym in SYMS})
+    tasks = [(sym, day) for day in sorted(set(dates)) for sym in SYMS]
+    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
+        futures = {ex.submit(fetch_and_upload, sym, day, uploaded): (sym, day)
+                   for sym, day in tasks}
+    for fut, (sym, day) in futures.items():
+        if fut.exception() is not None:
+            print(f"✗  {sym} {day}: {fut.exception()}")
 
 if __name__ == "__main__":
     main()
@@ -6,26 +6,43 @@ Assumes each YouTube video starts exactly 14:30 Eastern.
 """
 
 import re, json, s3fs, pyarrow as pa, pyarrow.parquet as pq
-from datetime import datetime, time, timedelta
+from datetime import datetime, time
+from functools import lru_cache
 from dateutil import tz
 
 BUCKET      = "fomcthesiss3"
 RAW_PREFIX  = "fomc_analysis/08_inference_results"
 OUT_PATH    = "s3://fomcthesiss3/analysis/segments.parquet"
 LOCAL_TZ    = tz.gettz("US/Eastern")
-BATCH_ROWS  = 50_000
+BATCH_ROWS  = 100_000         # one flush == one row group
+CAT_CHUNK   = 500           # paths per fs.cat() multi-get
 
 FNAME_RE = re.compile(
     r"FOMC_(?P<date>\d{8})_(?P<vid>[A-Za-z0-9_-]{11}).*?_seg(?P<seg>\d+)_inference\.json$"
 )
 
-fs = s3fs.S3FileSystem()
+fs = s3fs.S3FileSystem(config_kwargs={"max_pool_connections": 64})
 
+@lru_cache(maxsize=None)
 def meeting_start_utc(d8):
     """Return datetime UTC for 14:30 Eastern (handles DST) on yyyymmdd."""
     dt_local = datetime.strptime(d8, "%Y%m%d").replace(hour=14, minute=30, tzinfo=LOCAL_TZ)
     return dt_local.astimezone(tz.UTC)
 
+@lru_cache(maxsize=None)
+def meeting_start_ts(d8):
+    """Epoch seconds of meeting_start_utc(d8); one tz conversion per date."""
+    return meeting_start_utc(d8).timestamp()
+
+def iter_json(paths):
+    """Yield parsed JSON in input order; s3fs runs each chunk's GETs concurrently
+    on one async connection pool."""
+    for i in range(0, len(paths), CAT_CHUNK):
+        chunk = paths[i:i + CAT_CHUNK]
+        blobs = fs.cat(chunk)                    # {path: bytes}
+        for p in chunk:
+            yield json.loads(blobs[p])
+
 schema = pa.schema({
     "meeting_id": pa.string(),
     "video_id": pa.string(),
@@ -35,9 +52,28 @@ schema = pa.schema({
     "is_non_neutral": pa.int8(),
 })
 
-writer = pq.ParquetWriter(OUT_PATH, schema, filesystem=fs, compression="zstd")
-batch, total = [], 0
+writer = pq.ParquetWriter(
+    OUT_PATH, schema, filesystem=fs,
+    compression="zstd", compression_level=3,
+    use_dictionary=["meeting_id", "video_id", "emotion"],   # low-cardinality keys
+    data_page_size=1 << 20,
+)
+cols  = {name: [] for name in schema.names}    # column-wise batch (SoA)
+total = 0
+
+def flush():
+    """Write the buffered columns as one table and reset the buffers."""
+    global total
+    table = pa.Table.from_arrays(
+        [pa.array(cols[f.name], type=f.type) for f in schema], schema=schema
+    )
+    writer.write_table(table, row_group_size=BATCH_ROWS)
+    total += table.num_rows
+    for v in cols.values():
+        v.clear()
 
+# pass 1: list matching files (cheap LISTs only)
+matches, paths = [], []
 for dirpath, _, filenames in fs.walk(f"{BUCKET}/{RAW_PREFIX}"):
     for fn in filenames:
         if not fn.endswith("_inference.json"):
@@ -45,31 +81,27 @@ for dirpath, _, filenames in fs.walk(f"{BUCKET}/{RAW_PREFIX}"):
         m = FNAME_RE.match(fn)
         if not m:
             continue
+        matches.append(m)
+        paths.append(f"{dirpath}/{fn}")
+
+# pass 2: multi-get the JSON bodies in chunks
+for m, js in zip(matches, iter_json(paths)):
+    offset = js["input_segment_info"]["segment_start_s"]
+    ts_epoch = int(meeting_start_ts(m["date"]) + offset)
+
+    emotion = js["inference_details"]["parsed_answer"].lower().strip()   # canonical label
+    cols["meeting_id"].append(f"{m['date'][:4]}-{m['date'][4:6]}-{m['date'][6:]}")
+    cols["video_id"].append(m["vid"])
+    cols["segment_id"].append(int(m["seg"]))
+    cols["timestamp_utc"].append(ts_epoch)
+    cols["emotion"].append(emotion)
+    cols["is_non_neutral"].append(int(emotion != "neutral"))
+
+    if len(cols["meeting_id"]) >= BATCH_ROWS:
+        flush()
 
-        start_utc = meeting_start_utc(m["date"])
-        with fs.open(f"s3://{dirpath}/{fn}") as f:
-            js = json.load(f)
-
-        offset = js["input_segment_info"]["segment_start_s"]
-        ts_epoch = int((start_utc + timedelta(seconds=offset)).timestamp())
-
-        row = {
-            "meeting_id": f"{m['date'][:4]}-{m['date'][4:6]}-{m['date'][6:]}",
-            "video_id": m["vid"],
-            "segment_id": int(m["seg"]),
-            "timestamp_utc": ts_epoch,
-            "emotion": js["inference_details"]["parsed_answer"],
-            "is_non_neutral": int(js["inference_details"]["parsed_answer"].lower() != "neutral"),
-        }
-        batch.append(row)
-
-        if len(batch) >= BATCH_ROWS:
-            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
-            total += len(batch); batch.clear()
-
-if batch:
-    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
-    total += len(batch)
+if cols["meeting_id"]:
+    flush()
 
 writer.close()
 print(f"✓ {total:,} rows written to {OUT_PATH}")
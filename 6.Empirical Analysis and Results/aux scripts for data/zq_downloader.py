@@ -4,7 +4,8 @@ zq_downloader.py  –  download ZQ.FUT trades for each FOMC date
 and save Parquet to S3, matching the existing ES/ZT directory style.
 """
 
-import os, boto3, databento as db, pandas as pd
+import os, tempfile, boto3, databento as db
+import pyarrow.parquet as pq
 
 BUCKET  = "fomcthesiss3"
 PREFIX  = "market-data/es_ticks"
@@ -29,16 +30,30 @@ def s3_key(day: str) -> str:
     fname = f"{day}_{root}_{SCHEMA}.parquet"
     return f"{PREFIX}/{root}/date={day}/{fname}"
 
-def exists(key: str) -> bool:
-    try:
-        s3.head_object(Bucket=BUCKET, Key=key)
-        return True
-    except s3.exceptions.ClientError:
-        return False
+def existing_keys(root: str) -> set[str]:
+    """Every key already under PREFIX/<root>/ (one paginated LIST, no HEADs)."""
+    keys = set()
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=f"{PREFIX}/{root}/"):
+        keys.update(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+def upload_parquet(resp, key: str) -> int:
+    """DBN → local Parquet (written in chunks, no full DataFrame) → S3.
+    Returns the row count; nothing is uploaded when it is 0."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, os.path.basename(key))
+        resp.to_parquet(path, compression="zstd")
+        n = pq.ParquetFile(path).metadata.num_rows
+        if n:
+            s3.upload_file(path, BUCKET, key)
+    return n
+
+uploaded = existing_keys("ZQ")
 
 for day in MEETING_DATES:
     key = s3_key(day)
-    if exists(key):
+    if key in uploaded:
         print(f"↷  Skip {day} (already uploaded)")
         continue
 
@@ -56,11 +71,9 @@ for day in MEETING_DATES:
         end       = end,
     )
 
-    df = resp.to_df()
-    if df.empty:
+    n = upload_parquet(resp, key)
+    if not n:
         print(" no rows → skipped")
         continue
+    print(f" {n:,} rows → s3://{BUCKET}/{key}")
 
-    s3_uri = f"s3://{BUCKET}/{key}"
-    df.to_parquet(s3_uri, index=False, compression="zstd")
-    print(f" {len(df):,} rows → {s3_uri}")
@@ -23,9 +23,12 @@ import os, sys, math, json
 from pathlib import Path
 from datetime import datetime, timedelta, date
 from calendar import monthrange
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import s3fs
 from dateutil import tz
 
@@ -48,19 +51,29 @@ LOCAL_TZ = tz.gettz("US/Eastern")
 
 MONTH_CODE = {1:"F",2:"G",3:"H",4:"J",5:"K",6:"M",7:"N",8:"Q",9:"U",10:"V",11:"X",12:"Z"}
 
+# every single-leg monthly contract, e.g. ZQX4 (spreads like 'ZQ:BF F5-G5-J5' are not in here)
+ZQ_OUTRIGHTS = sorted(f"ZQ{c}{y}" for c in MONTH_CODE.values() for y in "0123456789")
+
+READ_WORKERS = 8       # meeting-day parquet reads in flight
+
 # ---------------------------------------------------------------------
 
+FS = s3fs.S3FileSystem(anon=False)   # shared → one connection pool for all reads
+
+@lru_cache(maxsize=None)
 def t0_utc_on_meeting_day(meeting_date_str: str) -> pd.Timestamp:
     """Return event time (14:30 ET) as tz-aware UTC Timestamp."""
     dt_local = datetime.strptime(meeting_date_str, "%Y-%m-%d").replace(hour=14, minute=30, second=0, microsecond=0, tzinfo=LOCAL_TZ)
     return pd.Timestamp(dt_local).tz_convert("UTC")
 
+@lru_cache(maxsize=None)
 def zq_symbol_for_meeting(meeting_date: date) -> str:
     """Meeting-month symbol (primary)."""
     m = meeting_date.month
     y = meeting_date.year % 10
     return f"ZQ{MONTH_CODE[m]}{y}"
 
+@lru_cache(maxsize=None)
 def zq_next_month_symbol(meeting_date: date) -> str:
     """Next month symbol (fallback)."""
     y = meeting_date.year
@@ -71,9 +84,16 @@ def zq_next_month_symbol(meeting_date: date) -> str:
 
 def read_ticks(day_iso: str) -> pd.DataFrame:
     """Read ZQ ticks parquet for a meeting day (handles tz-aware ts_event)."""
-    fs = s3fs.S3FileSystem(anon=False)
-    s3p = f"s3://{BUCKET}/" + S3_PATH_TMPL.format(d=day_iso)
-    df = pd.read_parquet(s3p, filesystem=fs)
+    s3p = f"{BUCKET}/" + S3_PATH_TMPL.format(d=day_iso)
+    # Project the 3 needed columns and keep only single-leg monthly contracts
+    # like ZQX4 (drop spreads like 'ZQ:BF F5-G5-J5') inside the reader, so
+    # row groups without outrights are never fetched from S3
+    df = pq.read_table(
+        s3p, filesystem=FS,
+        columns=["ts_event", "symbol", "price"],
+        filters=[("symbol", "in", ZQ_OUTRIGHTS)],
+        pre_buffer=True,
+    ).to_pandas()
 
     # Robust ts_event handling
     if pd.api.types.is_integer_dtype(df["ts_event"]):
@@ -83,19 +103,27 @@ def read_ticks(day_iso: str) -> pd.DataFrame:
     else:
         raise TypeError(f"Unexpected ts_event dtype: {df['ts_event'].dtype}")
 
-    # Keep only single-leg monthly contracts like ZQX4 (drop spreads like 'ZQ:BF F5-G5-J5')
-    df = df[df["symbol"].str.match(r"^ZQ[A-Z]\d$", na=False)].copy()
-
     # Ensure sorted
     df = df.sort_values("ts_event")
     return df
 
+def read_ticks_safe(day_iso: str) -> pd.DataFrame | None:
+    """read_ticks() that warns and returns None instead of raising."""
+    try:
+        return read_ticks(day_iso)
+    except FileNotFoundError:
+        print(f"[warn] ticks parquet not found for {day_iso}, skipping")
+    except Exception as e:
+        print(f"[warn] failed reading ticks for {day_iso}: {e}")
+    return None
+
 def last_price_in_window(series: pd.Series, start_ts: pd.Timestamp, end_ts: pd.Timestamp) -> float | None:
-    """Return the last observed price in [start_ts, end_ts]."""
-    s = series.loc[(series.index >= start_ts) & (series.index <= end_ts)]
-    if s.empty:
+    """Return the last observed price in [start_ts, end_ts] (index must be sorted)."""
+    i0 = series.index.searchsorted(start_ts, side="left")
+    i1 = series.index.searchsorted(end_ts, side="right")
+    if i1 <= i0:
         return None
-    return float(s.iloc[-1])
+    return float(series.iloc[i1 - 1])
 
 def compute_for_meeting(day_iso: str, df_day: pd.DataFrame) -> dict:
     """Compute surprise record for a meeting day given full-day ticks."""
@@ -180,15 +208,14 @@ def main():
     meeting_dates = sorted(m["meeting_date"].dropna().unique().tolist())
     print(f"[info] meetings from {MAP_CSV}: {len(meeting_dates)} rows")
 
+    # S3 reads are latency-bound → fetch all meeting days concurrently
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+        day_dfs = dict(zip(meeting_dates, ex.map(read_ticks_safe, meeting_dates)))
+
     rows = []
     for day in meeting_dates:
-        try:
-            df_day = read_ticks(day)
-        except FileNotFoundError:
-            print(f"[warn] ticks parquet not found for {day}, skipping")
-            continue
-        except Exception as e:
-            print(f"[warn] failed reading ticks for {day}: {e}")
+        df_day = day_dfs.pop(day)
+        if df_day is None:
             continue
 
         rec = compute_for_meeting(day, df_day)
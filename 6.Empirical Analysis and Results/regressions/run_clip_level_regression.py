@@ -16,7 +16,8 @@ Defaults (changeable via CLI flags):
   --outdir   ~/reg_outputs
 
 Outputs (LOCAL ONLY → <outdir>/results):
-  - clip_reg_base.csv    : tidy coefficients (coef, se, pval) for pooled/ES/ZT
+  - clip_reg_base.csv    : tidy coefficients (coef, se, pval) for pooled/ES/ZT (%.6g)
+  - clip_reg_base.parquet: same table at full precision
   - clip_reg_base.txt    : readable summaries + diagnostics
 
 Run:
@@ -45,7 +46,7 @@ try:
 except Exception:
     missing.append("pyarrow")
 try:
-    import statsmodels.formula.api as smf
+    import statsmodels.api as sm
     from statsmodels.iolib.summary2 import summary_col
 except Exception:
     missing.append("statsmodels")
@@ -60,47 +61,75 @@ if missing:
     print("Install with:\n  pip install --user " + " ".join(missing))
     sys.exit(1)
 
+import numpy as np
 import pandas as pd
-import statsmodels.formula.api as smf
+import pyarrow.parquet as pq
+import statsmodels.api as sm
 from statsmodels.stats.contrast import ContrastResults
 
+EMOTIONS = pd.CategoricalDtype(["neutral", "happy", "surprise", "anxious"])
+
 # -------------------- helpers --------------------
 def is_s3(uri: str) -> bool:
     return isinstance(uri, str) and uri.lower().startswith("s3://")
 
-def read_parquet(uri: str) -> pd.DataFrame:
+def to_emotion(s: pd.Series) -> pd.Categorical:
+    """Lower-case/strip labels into EMOTIONS; anything else (incl. missing) → NaN."""
+    labels = s.astype(str).str.lower().str.strip()
+    return pd.Categorical.from_codes(EMOTIONS.categories.get_indexer(labels), dtype=EMOTIONS)
+
+def read_parquet(uri: str, columns=None) -> pd.DataFrame:
+    """Read `columns` (those present in the file; None = all) — other column chunks are never fetched."""
+    fs = None
     if is_s3(uri):
         if not _HAS_S3:
             print("[fatal] s3:// path provided but s3fs not installed. Run: pip install --user s3fs")
             sys.exit(1)
         import s3fs  # type: ignore
         fs = s3fs.S3FileSystem(anon=False)
-        return pd.read_parquet(uri, filesystem=fs)
-    else:
-        return pd.read_parquet(uri)
+    if columns is not None:
+        if fs is None:
+            names = set(pq.read_schema(uri).names)
+        else:
+            with fs.open(uri, "rb") as f:
+                names = set(pq.read_schema(f).names)
+        columns = [c for c in columns if c in names]   # absent ones are reported by the checks in main
+    return pd.read_parquet(uri, columns=columns, filesystem=fs)
 
 def winsorize(s: pd.Series, sigma: float) -> pd.Series:
-    s = s.copy()
     if sigma and pd.api.types.is_numeric_dtype(s):
-        cap = sigma * s.std(ddof=0)
-        return s.clip(-cap, cap)
+        arr = np.asarray(s, dtype=np.float64)
+        cap = sigma * np.nanstd(arr)               # ddof=0, NaNs skipped like pandas
+        return pd.Series(np.clip(arr, -cap, cap), index=s.index, name=s.name)
     return s
 
-def tidy_coefs(fit, model_id: str) -> pd.DataFrame:
-    out = (
-        fit.params.to_frame("coef")
-        .join(fit.bse.rename("se"))
-        .join(fit.pvalues.rename("pval"))
-        .reset_index()
-        .rename(columns={"index": "term"})
-    )
-    out.insert(0, "model", model_id)
-    out["nobs"] = int(fit.nobs)
+def design_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """Exog for `~ is_non_neutral + pre_px_60 + C(sym)`, built once for all models.
+    Columns are named/ordered like patsy's so summaries, terms and f_test strings match."""
+    sym = pd.get_dummies(df["sym"].astype(str), dtype="float64")
+    sym = sym.drop(columns=sym.columns[0])          # first level is the baseline
+    sym.columns = [f"C(sym)[T.{c}]" for c in sym.columns]
+    return pd.concat([
+        pd.Series(1.0, index=df.index, name="Intercept"),
+        sym,
+        df[["is_non_neutral", "pre_px_60"]].astype("float64"),
+    ], axis=1)
+
+TIDY_DTYPES = {"model": "object", "term": "object", "coef": "float64", "se": "float64",
+               "pval": "float64", "nobs": "int64", "r2": "float64"}
+
+def tidy_coefs(fit, model_id: str) -> list[dict]:
+    """One record per term; records from all models are framed once at the end."""
+    nobs = int(fit.nobs)
     try:
-        out["r2"] = float(fit.rsquared)
+        r2 = float(fit.rsquared)
     except Exception:
-        out["r2"] = pd.NA
-    return out
+        r2 = float("nan")
+    return [
+        {"model": model_id, "term": term, "coef": float(b), "se": float(se),
+         "pval": float(p), "nobs": nobs, "r2": r2}
+        for term, b, se, p in zip(fit.params.index, fit.params, fit.bse, fit.pvalues)
+    ]
 
 def wald_line(fit, hypothesis: str, label: str) -> str:
     try:
@@ -127,9 +156,10 @@ def main():
     results_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"[info] reading segments: {args.segments}")
-    segments = read_parquet(args.segments)
+    segments = read_parquet(args.segments, columns=["meeting_id","segment_id","timestamp_utc","emotion"])
     print(f"[info] reading returns : {args.returns}")
-    returns = read_parquet(args.returns)
+    returns = read_parquet(args.returns, columns=["meeting_id","segment_id","timestamp_utc","sym",
+                                                  "d_px_60","pre_px_60","emotion","is_non_neutral"])
 
     # Required columns (video_id optional)
     need_seg = {"meeting_id","segment_id","timestamp_utc","emotion"}
@@ -140,17 +170,23 @@ def main():
         sys.exit(f"[fatal] segments missing columns: {miss_seg}")
     if miss_ret:
         sys.exit(f"[fatal] returns missing columns: {miss_ret}")
+    # stored as float32; design_matrix() builds the float64 exog
+    for c in ("d_px_60", "pre_px_60"):
+        returns[c] = returns[c].astype(np.float32)
+    returns["sym"] = returns["sym"].astype("category")
 
     # Merge emotion/is_non_neutral if needed
     segments["emotion"] = segments["emotion"].astype(str).str.lower().str.strip()
     if "is_non_neutral" not in returns.columns:
         if "emotion" not in returns.columns:
-            # attach emotion by (meeting_id, segment_id) m:1
-            returns = returns.merge(
-                segments[["meeting_id","segment_id","emotion"]],
-                on=["meeting_id","segment_id"], how="left", validate="m:1"
-            )
-        returns["is_non_neutral"] = (returns["emotion"].fillna("").str.lower() != "neutral").astype(int)
+            # attach emotion by (meeting_id, segment_id) m:1 — keyed lookup, no join
+            seg_emotion = segments.set_index(["meeting_id","segment_id"])["emotion"]
+            returns["emotion"] = pd.MultiIndex.from_frame(returns[["meeting_id","segment_id"]]).map(seg_emotion)
+        else:
+            # returns-side labels may be raw ("Neutral", "neutral ")
+            returns["emotion"] = to_emotion(returns["emotion"])
+        # missing/unknown emotion counts as non-neutral, as before
+        returns["is_non_neutral"] = (returns["emotion"].to_numpy() != "neutral").astype(int)
     else:
         # ensure 0/1 ints
         returns["is_non_neutral"] = returns["is_non_neutral"].astype(int)
@@ -162,31 +198,34 @@ def main():
     # Drop rows with missing y or controls
     df = returns.dropna(subset=["d_px_60_w","pre_px_60","is_non_neutral","meeting_id","sym"]).copy()
 
-    # meeting_id as category (but clustering by original labels is fine)
+    # meeting_id as str; cluster on int32 codes so statsmodels doesn't re-hash strings per fit
     df["meeting_id"] = df["meeting_id"].astype(str)
+    df["mid_code"] = pd.factorize(df["meeting_id"])[0].astype(np.int32)
+
+    # Design matrix once; each model is a row subset (single-asset drops C(sym))
+    X = design_matrix(df)
+    base_cols = [c for c in X.columns if not c.startswith("C(sym)")]
 
     # Three models: pooled (ES+ZT), ES only, ZT only
     outputs = []
     summaries = []
     models = [
-        ("pooled", df),
-        ("ES_only", df[df["sym"]=="ES"]),
-        ("ZT_only", df[df["sym"]=="ZT"]),
+        ("pooled", df["sym"].notna(), list(X.columns)),
+        ("ES_only", df["sym"]=="ES", base_cols),
+        ("ZT_only", df["sym"]=="ZT", base_cols),
     ]
 
-    for model_id, d in models:
+    for model_id, rows, cols in models:
+        d = df[rows]
         if d.empty or d["meeting_id"].nunique() < 2:
             summaries.append(f"[warn] {model_id}: insufficient data (rows={len(d)}, unique meetings={d['meeting_id'].nunique()}) — skipped.")
             continue
 
-        # Formula: pooled has C(sym); single-asset drops it
-        formula = "d_px_60_w ~ is_non_neutral + pre_px_60" + ("" if model_id!="pooled" else " + C(sym)")
-
-        fit = smf.ols(formula, data=d).fit(
-            cov_type="cluster", cov_kwds={"groups": d["meeting_id"]}
+        fit = sm.OLS(d["d_px_60_w"], X.loc[rows, cols]).fit(
+            cov_type="cluster", cov_kwds={"groups": d["mid_code"].to_numpy()}
         )
 
-        outputs.append(tidy_coefs(fit, model_id))
+        outputs.extend(tidy_coefs(fit, model_id))
 
         # text summary block
         head = f"\n=== {model_id} ===\nrows={len(d):,}, meetings={d['meeting_id'].nunique()}, winsor_sigma={args.winsor_sigma}"
@@ -197,10 +236,11 @@ def main():
     if not outputs:
         sys.exit("[fatal] no estimable models; check inputs.")
 
-    coef_all = pd.concat(outputs, ignore_index=True)
+    coef_all = pd.DataFrame.from_records(outputs, columns=list(TIDY_DTYPES)).astype(TIDY_DTYPES)
     coef_path = results_dir / "clip_reg_base.csv"
-    coef_all.to_csv(coef_path, index=False)
-    print(f"[write] {coef_path}")
+    coef_all.to_parquet(coef_path.with_suffix(".parquet"), index=False)   # full precision
+    coef_all.to_csv(coef_path, index=False, float_format="%.6g")
+    print(f"[write] {coef_path} (+ .parquet)")
 
     # write human-readable summaries
     txt = [
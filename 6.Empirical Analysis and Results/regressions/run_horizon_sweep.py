@@ -13,11 +13,15 @@ Errors clustered by meeting_id. Neutral is omitted category.
 """
 
 import os, sys, warnings
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import s3fs
 import matplotlib.pyplot as plt
-import statsmodels.formula.api as smf
+from scipy import stats
 
 # ── CONFIG ──────────────────────────────────────────────────────────────────
 BUCKET        = "fomcthesiss3"
@@ -26,8 +30,12 @@ RETURNS_URI   = f"s3://{BUCKET}/analysis/seg_returns.parquet"
 TICK_ROOT     = f"s3://{BUCKET}/market-data/es_ticks"   # ES/ZT/date=YYYY-MM-DD/*.parquet
 
 ASSETS        = ["ES", "ZT"]
+EMOTIONS      = pd.CategoricalDtype(["neutral", "happy", "surprise", "anxious"])
+EMO_TERMS     = ["emo_happy", "emo_surprise", "emo_anxious"]   # neutral omitted
+EXOG          = EMO_TERMS + ["pre_px_60"]
 HORIZONS      = list(range(0, 301, 25))                  # every 5s up to 300s
 WINSOR_SIGMA  = 3.0
+READ_WORKERS  = 16                                       # concurrent tick-file reads
 
 OUT_ROOT      = "/home/ubuntu/reg_outputs/horizon"
 OUT_RESULTS   = os.path.join(OUT_ROOT, "results")
@@ -41,111 +49,189 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 # ── IO helpers ──────────────────────────────────────────────────────────────
 fs = s3fs.S3FileSystem(anon=False)
 
-def read_parquet(uri: str) -> pd.DataFrame:
-    return pd.read_parquet(uri, filesystem=fs)
+def to_emotion(s: pd.Series) -> pd.Categorical:
+    """Lower-case/strip labels into EMOTIONS; anything else (incl. missing) → NaN."""
+    labels = s.astype(str).str.lower().str.strip()
+    return pd.Categorical.from_codes(EMOTIONS.categories.get_indexer(labels), dtype=EMOTIONS)
 
-def glob_first(path_glob: str) -> str | None:
-    matches = fs.glob(path_glob)
-    return matches[0] if matches else None
+def read_parquet(uri: str, columns=None) -> pd.DataFrame:
+    """Read only `columns` that exist in the file (None = all); skipped column chunks never leave S3."""
+    if columns is not None:
+        with fs.open(uri, "rb") as f:
+            names = set(pq.read_schema(f).names)
+        columns = [c for c in columns if c in names]
+    return pd.read_parquet(uri, columns=columns, filesystem=fs)
+
+def index_tick_files() -> dict:
+    """dict[(sym, 'YYYY-MM-DD')] -> first parquet key, from a single glob."""
+    files = {}
+    for key in sorted(fs.glob(f"{TICK_ROOT}/*/date=*/*.parquet")):
+        sym, part = key.split("/")[-3:-1]
+        files.setdefault((sym, part.removeprefix("date=")), key)
+    return files
 
 # ── Price cache builder (per meeting × asset) ───────────────────────────────
+def load_price_series(sym, key):
+    """1s last-trade (secs, prices) arrays, secs ascending; None if unusable."""
+    try:
+        ticks = pq.read_table(key, filesystem=fs, columns=["ts_event", "price"])
+    except pa.ArrowInvalid:
+        print(f"[warn] missing ts_event/price in {key}; skipping")
+        return None
+    # derive seconds/prices with Arrow kernels (no pandas datetime → int64 copy)
+    ns    = ticks["ts_event"].cast(pa.int64())
+    order = pc.sort_indices(ns)                  # stable: ties keep file order
+    sec   = pc.divide(pc.take(ns, order), 1_000_000_000).to_numpy()
+    price = pc.take(ticks["price"].cast(pa.float64()), order)
+    if sym == "ES":  # keep consistent with earlier scaling
+        price = pc.divide(price, 100.0)
+    # the last trade within each second wins
+    last = (pd.Series(price.to_numpy(), index=pd.Index(sec, name="sec"), name="price")
+              .groupby(level="sec", sort=False).last())
+    return (np.ascontiguousarray(last.index.to_numpy(dtype=np.int64)),
+            np.ascontiguousarray(last.to_numpy(dtype=np.float64)))
+
 def build_price_cache(meeting_ids):
-    """dict[(meeting_id, sym)] -> 1s last-trade pd.Series indexed by epoch seconds."""
-    cache = {}
+    """dict[(meeting_id, sym)] -> (secs, prices): 1s last-trade arrays, secs ascending."""
+    files = index_tick_files()
+    syms, keys, mtgs = [], [], []
     for sym in ASSETS:
         for mtg in sorted(set(meeting_ids)):
-            folder = f"{TICK_ROOT}/{sym}/date={mtg}/*.parquet"
-            key = glob_first(folder)
+            key = files.get((sym, mtg))
             if key is None:
-                print(f"[warn] no ticks for {sym} {mtg} under {folder}")
+                print(f"[warn] no ticks for {sym} {mtg} under {TICK_ROOT}/{sym}/date={mtg}/")
                 continue
-            ticks = pd.read_parquet(f"s3://{key}", filesystem=fs)
-            if "ts_event" not in ticks.columns or "price" not in ticks.columns:
-                print(f"[warn] missing ts_event/price in {key}; skipping")
-                continue
-            sec = ticks["ts_event"].astype("int64") // 1_000_000_000
-            price = ticks["price"].astype("float64").copy()
-            if sym == "ES":  # keep consistent with earlier scaling
-                price = price / 100.0
-            series = (pd.DataFrame({"sec": sec, "price": price})
-                        .drop_duplicates("sec").sort_values("sec")
-                        .set_index("sec")["price"])
-            cache[(mtg, sym)] = series
+            syms.append(sym)
+            keys.append(key)
+            mtgs.append(mtg)
+
+    # each (meeting, sym) is one GET → overlap them; one writer per cache key
+    cache = {}
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+        series = ex.map(load_price_series, syms, keys)
+        for sym, mtg, s in zip(syms, mtgs, series):
+            if s is not None:
+                cache[(mtg, sym)] = s
     return cache
 
 # ── Forward returns ─────────────────────────────────────────────────────────
-def sec_of(x) -> int:
-    if isinstance(x, (int, np.integer)):
-        return int(x)
-    return int(pd.Timestamp(x).value // 1_000_000_000)
+def epoch_seconds(ts: pd.Series):
+    """timestamp_utc → (int64 epoch seconds, valid mask) for the whole column at once.
+    Numeric columns are already seconds; anything else goes through pd.to_datetime."""
+    if pd.api.types.is_numeric_dtype(ts):
+        valid = ts.notna().to_numpy()
+        return ts.fillna(0).to_numpy(dtype=np.int64), valid
+    secs = (pd.to_datetime(ts, utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    valid = secs.notna().to_numpy()
+    return secs.fillna(0).to_numpy(dtype=np.int64), valid
 
 def add_forward_returns(df, price_cache, horizons):
+    """d_px_h = last price at or before t0+h minus last price at or before t0.
+
+    Rows are split once per (meeting_id, sym); each group is resolved with
+    asof lookups (np.searchsorted) on that group's cached second/price arrays,
+    all horizons in one call over the (rows × H) grid of t0 + h.
+    """
     df = df.copy()
-    for h in horizons:
-        col = f"d_px_{h}"
-        out = np.full(len(df), np.nan)
-        for i, r in df.iterrows():
-            key = (r["meeting_id"], r["sym"])
-            series = price_cache.get(key)
-            if series is None or pd.isna(r["timestamp_utc"]):
-                continue
-            t0 = sec_of(r["timestamp_utc"])
-            try:
-                p0 = series.loc[:t0].iloc[-1]
-            except Exception:
-                continue
-            try:
-                p1 = series.loc[:t0 + h].iloc[-1]
-            except Exception:
-                p1 = p0
-            out[i] = p1 - p0
-        df[col] = out
+    hs = np.asarray(horizons, dtype=np.int64)
+    out = np.full((len(df), len(hs)), np.nan, dtype=np.float32)   # price deltas fit in float32
+    secs, valid = epoch_seconds(df["timestamp_utc"])                # converted once, not per row
+    for key, pos in df.groupby(["meeting_id", "sym"], sort=False).indices.items():
+        arrays = price_cache.get(key)
+        if arrays is None:
+            continue
+        times, prices = arrays
+
+        pos = pos[valid[pos]]
+        t0 = secs[pos]
+
+        i0 = np.searchsorted(times, t0, side="right") - 1
+        keep = i0 >= 0                        # no trade at/before t0 → NaN
+        pos, t0, i0 = pos[keep], t0[keep], i0[keep]
+        p0 = prices[i0][:, None]
+        i1 = np.searchsorted(times, (t0[:, None] + hs).ravel(), side="right").reshape(-1, len(hs)) - 1
+        p1 = np.where(i1 >= 0, prices[i1], p0)
+        out[pos] = p1 - p0                    # positional, independent of df.index
+    for j, h in enumerate(horizons):
+        df[f"d_px_{h}"] = out[:, j]
     return df
 
-def winsorize(s: pd.Series, sigma: float) -> pd.Series:
-    s = s.astype("float64")
-    std = s.std(skipna=True, ddof=0)
-    cap = sigma * std
-    return s.clip(-cap, cap)
+def winsorize(Y: np.ndarray, sigma: float) -> np.ndarray:
+    """Clip each column of Y in place at ±sigma·std (ddof=0, NaNs skipped)."""
+    caps = sigma * np.nanstd(Y, axis=0)
+    return np.clip(Y, -caps, caps, out=Y)
 
 # ── Regression per asset & horizon ─────────────────────────────────────────
-def run_regressions(df, asset, horizons, winsor_sigma):
+def ols_cluster(X, Y, groups):
+    """OLS of every column of Y (n × H) on X (n × k) with cluster-robust SEs.
+
+    (XᵀX)⁻¹ is formed once and shared by all H responses. Matches statsmodels'
+    cov_type="cluster" defaults: meat Σ_g (X_gᵀe_g)(X_gᵀe_g)ᵀ, small-sample factor
+    G/(G-1)·(n-1)/(n-k), normal p-values. Returns (B, se, pval, r2); B/se/pval are k × H.
+    `groups` must be non-decreasing (rows ordered by cluster).
+    """
+    n, k = X.shape
+    XtX_inv = np.linalg.pinv(X.T @ X)
+    B = XtX_inv @ (X.T @ Y)
+    E = Y - X @ B
+
+    # per-cluster score sums via reduceat: clusters are contiguous row runs
+    step = np.diff(groups)
+    if (step < 0).any():
+        raise ValueError("ols_cluster: rows must be sorted by cluster")
+    starts = np.flatnonzero(np.r_[True, step != 0])
+    S = np.add.reduceat(X[:, :, None] * E[:, None, :], starts, axis=0)           # G × k × H
+    G = len(starts)
+
+    meat = np.einsum("gkh,glh->hkl", S, S)
+    cov = XtX_inv @ meat @ XtX_inv * (G / (G - 1) * (n - 1) / (n - k))         # H × k × k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se = np.sqrt(np.diagonal(cov, axis1=1, axis2=2)).T
+        pval = 2 * stats.norm.sf(np.abs(B / se))
+        r2 = 1 - (E ** 2).sum(axis=0) / ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+    return B, se, pval, r2
+
+def run_regressions(dfa, asset, horizons, winsor_sigma):
+    """dfa: the rows of one asset (a groupby("sym") group)."""
     out_rows = []
-    dfa = df.loc[df["sym"] == asset].copy()
-    dfa["emotion"] = dfa["emotion"].str.lower()
-    dfa["emo_happy"]    = (dfa["emotion"] == "happy").astype(int)
-    dfa["emo_surprise"] = (dfa["emotion"] == "surprise").astype(int)
-    dfa["emo_anxious"]  = (dfa["emotion"] == "anxious").astype(int)
 
     # save counts for sanity
     cnt_path = os.path.join(OUT_RESULTS, f"counts_{asset}.csv")
     (dfa["emotion"].value_counts().rename("count")).to_csv(cnt_path)
     print(f"[write] {cnt_path}")
 
-    for h in horizons:
-        yraw = dfa[f"d_px_{h}"]
-        dfa[f"y{h}"] = winsorize(yraw, winsor_sigma)
-        formula = f"y{h} ~ emo_happy + emo_surprise + emo_anxious + pre_px_60"
-        fit = smf.ols(formula, data=dfa).fit(
-            cov_type="cluster", cov_kwds={"groups": dfa["meeting_id"]}
-        )
-        for term in fit.params.index:
+    # winsorize all horizons at once on a contiguous (n, H) block
+    Y = dfa[[f"d_px_{h}" for h in horizons]].to_numpy(dtype=np.float64, copy=True)
+    winsorize(Y, winsor_sigma)
+
+    # y_h ~ emo_happy + emo_surprise + emo_anxious + pre_px_60: only y changes
+    # across horizons. A row missing one horizon misses them all (no trade at or
+    # before t0), so one valid-row mask per asset serves every horizon and all H
+    # responses are solved in one go.
+    X = np.column_stack([np.ones(len(dfa)), dfa[EXOG].to_numpy(dtype=np.float64)])
+    terms = ["Intercept"] + EXOG
+    groups = dfa["mid_code"].to_numpy()
+    rows = np.isfinite(X).all(axis=1) & np.isfinite(Y).all(axis=1) & (groups >= 0)
+    B, se, pval, r2 = ols_cluster(X[rows], Y[rows], groups[rows])
+    nobs = int(rows.sum())
+
+    for j, h in enumerate(horizons):
+        for k, term in enumerate(terms):
             out_rows.append({
                 "asset": asset,
                 "horizon_s": h,
                 "term": term,
-                "coef": float(fit.params[term]),
-                "se":   float(fit.bse[term]),
-                "pval": float(fit.pvalues[term]),
-                "nobs": int(fit.nobs),
-                "r2":   float(fit.rsquared),
+                "coef": float(B[k, j]),
+                "se":   float(se[k, j]),
+                "pval": float(pval[k, j]),
+                "nobs": nobs,
+                "r2":   float(r2[j]),
             })
     return pd.DataFrame(out_rows)
 
 def plot_emotion_paths(tidy, asset, outfile):
-    emo_terms = ["emo_happy", "emo_surprise", "emo_anxious"]
     fig, ax = plt.subplots(figsize=(8, 5), dpi=150)
-    for term, marker in zip(emo_terms, ["o", "s", "D"]):
+    for term, marker in zip(EMO_TERMS, ["o", "s", "D"]):
         sub = tidy[(tidy["asset"] == asset) & (tidy["term"] == term)].sort_values("horizon_s")
         if sub.empty: 
             continue
@@ -164,24 +250,34 @@ def plot_emotion_paths(tidy, asset, outfile):
 # ── Main ───────────────────────────────────────────────────────────────────
 def main():
     print("[info] reading segments:", SEGMENTS_URI)
-    seg = read_parquet(SEGMENTS_URI)[["meeting_id","segment_id","emotion"]]
-    seg["emotion"] = seg["emotion"].str.lower()
+    seg = read_parquet(SEGMENTS_URI, columns=["meeting_id","segment_id","emotion"])
+    seg["emotion"] = to_emotion(seg["emotion"])
     seg = seg.drop_duplicates(subset=["meeting_id","segment_id"], keep="last")
 
     print("[info] reading returns :", RETURNS_URI)
-    rets = read_parquet(RETURNS_URI)
+    rets = read_parquet(RETURNS_URI, columns=["meeting_id","segment_id","sym","timestamp_utc",
+                                              "pre_px_60","emotion"])
 
     # minimal required columns (do NOT require video_id)
     required = {"meeting_id","segment_id","sym","timestamp_utc","pre_px_60"}
     missing = required - set(rets.columns)
     if missing:
         sys.exit(f"[error] returns missing columns: {missing}")
+    rets["pre_px_60"] = rets["pre_px_60"].astype(np.float32)
+    # categorical sym (ASSETS order): comparisons/groupbys run on int codes; other symbols → NaN, never regressed
+    rets["sym"] = rets["sym"].astype(pd.CategoricalDtype(ASSETS))
 
-    # attach/fill emotion if needed
+    # attach/fill emotion if needed: keyed lookup into the (unique) segment labels
+    if "emotion" in rets.columns:
+        rets["emotion"] = to_emotion(rets["emotion"])
     if "emotion" not in rets.columns or rets["emotion"].isna().any():
-        rets = rets.merge(
-            seg, on=["meeting_id","segment_id"], how="left", validate="many_to_one"
-        )
+        seg_emotion = seg.set_index(["meeting_id","segment_id"])["emotion"]
+        keys = pd.MultiIndex.from_frame(rets[["meeting_id","segment_id"]])
+        emo = pd.Series(keys.map(seg_emotion), index=rets.index)
+        rets["emotion"] = rets["emotion"].fillna(emo) if "emotion" in rets.columns else emo
+    # sort by meeting once: mid_code is then non-decreasing in every asset slice,
+    # which ols_cluster relies on to sum scores per meeting without an argsort
+    rets = rets.sort_values("meeting_id", kind="mergesort").reset_index(drop=True)
 
     # build price cache once
     mtg_ids = rets["meeting_id"].dropna().unique().tolist()
@@ -192,18 +288,23 @@ def main():
     print(f"[info] computing forward returns for horizons: {HORIZONS}")
     df = add_forward_returns(rets, cache, HORIZONS)
 
-    # regress per asset
+    # emotion dummies once for all assets (int8; neutral is the omitted baseline)
+    df = pd.concat([df, pd.get_dummies(df["emotion"], prefix="emo", dtype=np.int8)[EMO_TERMS]], axis=1)
+    df["mid_code"] = pd.factorize(df["meeting_id"])[0].astype(np.int32)  # cluster ids, hashed once
+
+    # regress per asset: one split pass (categorical → groups come out in ASSETS order)
     all_tidy = []
-    for asset in ASSETS:
+    for asset, dfa in df.groupby("sym", observed=True):
         print(f"\n=== {asset}: regressions across horizons ===")
-        tidy = run_regressions(df, asset, HORIZONS, WINSOR_SIGMA)
+        tidy = run_regressions(dfa, asset, HORIZONS, WINSOR_SIGMA)
         all_tidy.append(tidy)
     tidy_all = pd.concat(all_tidy, ignore_index=True)
 
-    # write tidy CSV and plots
+    # write tidy table (Parquet full precision + compact CSV) and plots
     tidy_path = os.path.join(OUT_RESULTS, "per_emotion_horizon_tidy.csv")
-    tidy_all.to_csv(tidy_path, index=False)
-    print(f"[write] {tidy_path}")
+    tidy_all.to_parquet(tidy_path[:-4] + ".parquet", index=False)
+    tidy_all.to_csv(tidy_path, index=False, float_format="%.6g")
+    print(f"[write] {tidy_path} (+ .parquet)")
 
     for asset in ASSETS:
         out_png = os.path.join(OUT_FIGS, f"{asset}_emotion_coef_by_horizon.png")
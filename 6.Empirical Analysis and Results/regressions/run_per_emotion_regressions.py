@@ -6,7 +6,8 @@ run_per_emotion_regressions.py
 Disaggregated per-emotion clip-level regressions at 60s horizon, ES and ZT
 separately, with cluster-robust SEs by meeting, estimated:
   (a) without meeting FE
-  (b) with meeting FE: C(meeting_id)
+  (b) with meeting FE, absorbed by within-meeting demeaning (same slopes/SEs
+      as C(meeting_id) dummies; FE levels and intercept are not reported)
 
 Outcome: d_px_60 (winsorized copy ±sigma)
 Regressors: emo_happy, emo_surprise, emo_anxious (neutral omitted), pre_px_60
@@ -18,7 +19,8 @@ Inputs (Parquet; S3 or local):
               (emotion optional; if absent we merge it in)
 
 Outputs (LOCAL ONLY → <outdir>/results):
-  per_emotion_60s_tidy.csv        # tidy coefficients for ES/ZT × {noFE, FE}
+  per_emotion_60s_tidy.csv        # tidy coefficients for ES/ZT × {noFE, FE} (%.6g)
+  per_emotion_60s_tidy.parquet    # same table, full precision, for downstream reads
   per_emotion_60s_counts.csv      # counts by emotion used in each model
   per_emotion_60s_summary.txt     # human-readable summaries & joint tests
 
@@ -61,30 +63,79 @@ if missing:
     print("Install with:\n  pip install --user " + " ".join(missing))
     sys.exit(1)
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+import statsmodels.api as sm
 import statsmodels.formula.api as smf
+from statsmodels.regression.linear_model import OLSResults, RegressionResultsWrapper
+from statsmodels.stats.sandwich_covariance import cov_cluster
+
+EMOTIONS  = pd.CategoricalDtype(["neutral", "happy", "surprise", "anxious"])
+EMO_TERMS = ["emo_happy", "emo_surprise", "emo_anxious"]   # neutral omitted
 
 # -------------------- helpers --------------------
 def is_s3(uri: str) -> bool:
     return isinstance(uri, str) and uri.lower().startswith("s3://")
 
-def read_parquet(uri: str) -> pd.DataFrame:
+def to_emotion(s: pd.Series) -> pd.Categorical:
+    """Lower-case/strip labels into EMOTIONS; anything else (incl. missing) → NaN."""
+    labels = s.astype(str).str.lower().str.strip()
+    return pd.Categorical.from_codes(EMOTIONS.categories.get_indexer(labels), dtype=EMOTIONS)
+
+def read_parquet(uri: str, columns=None) -> pd.DataFrame:
+    """Read `columns` (those present in the file; None = all) — other column chunks are never fetched."""
+    fs = None
     if is_s3(uri):
         if not _HAS_S3:
             print("[fatal] s3:// path provided but s3fs not installed. Run: pip install --user s3fs")
             sys.exit(1)
         import s3fs  # type: ignore
         fs = s3fs.S3FileSystem(anon=False)
-        return pd.read_parquet(uri, filesystem=fs)
-    else:
-        return pd.read_parquet(uri)
+    if columns is not None:
+        if fs is None:
+            names = set(pq.read_schema(uri).names)
+        else:
+            with fs.open(uri, "rb") as f:
+                names = set(pq.read_schema(f).names)
+        columns = [c for c in columns if c in names]   # absent ones are reported by the checks in main
+    return pd.read_parquet(uri, columns=columns, filesystem=fs)
 
 def winsorize(s: pd.Series, sigma: float) -> pd.Series:
     if not sigma: return s
     cap = sigma * s.std(ddof=0)
     return s.clip(-cap, cap)
 
-def tidy_coefs(fit, model_id: str, asset: str, spec: str, meetings_used: int) -> pd.DataFrame:
+def fit_meeting_fe(d: pd.DataFrame, y: str, exog: list):
+    """y ~ exog + meeting FE via within-meeting demeaning (FWL), clustered by meeting.
+
+    The intercept + M-1 meeting dummies are absorbed, so df_resid = n-k-M and the
+    cluster covariance carries the dummy model's factor G/(G-1)·(n-1)/(n-k-M):
+    slopes, SEs and F-tests equal the C(meeting_id) fit (normal p-values, G-1
+    denominator df, as statsmodels' cluster default). Returns (fit, r2) with r2
+    the R² of the full FE model; the fit's own R² is the within R².
+    """
+    cols = [y] + exog
+    x = d[cols].astype(np.float64)
+    g = d["mid_code"].to_numpy()
+    dm = x - x.groupby(g, sort=False).transform("mean")
+    n, k, m = len(d), len(exog), len(np.unique(g))
+
+    model = sm.OLS(dm[y], dm[exog])
+    model.df_resid = n - k - m
+    ols = model.fit()
+    cov = cov_cluster(ols, g, use_correction=False) * (m / (m - 1) * (n - 1) / (n - k - m))
+    res = OLSResults(model, ols.params.to_numpy(), ols.normalized_cov_params, use_t=False,
+                     cov_params_default=cov, df_resid_inference=m - 1)
+    res.cov_type = "cluster"
+    res.cov_kwds = {"description": "Standard Errors are robust to cluster correlation "
+                                   "(meeting); meeting FE absorbed by demeaning"}
+    fit = RegressionResultsWrapper(res)
+    r2 = 1.0 - fit.ssr / float(((x[y] - x[y].mean()) ** 2).sum())
+    return fit, r2
+
+def tidy_coefs(fit, model_id: str, asset: str, spec: str, meetings_used: int,
+               r2: float | None = None) -> pd.DataFrame:
     out = (
         fit.params.to_frame("coef")
         .join(fit.bse.rename("se"))
@@ -96,7 +147,7 @@ def tidy_coefs(fit, model_id: str, asset: str, spec: str, meetings_used: int) ->
     out.insert(1, "spec", spec)  # "noFE" or "FE"
     out.insert(2, "model", model_id)
     out["nobs"] = int(fit.nobs)
-    out["r2"] = float(getattr(fit, "rsquared", float("nan")))
+    out["r2"] = float(getattr(fit, "rsquared", float("nan")) if r2 is None else r2)
     out["meetings_used"] = int(meetings_used)
     return out
 
@@ -132,9 +183,10 @@ def main():
     results_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"[info] reading segments: {args.segments}")
-    segments = read_parquet(args.segments)
+    segments = read_parquet(args.segments, columns=["meeting_id","segment_id","timestamp_utc","emotion"])
     print(f"[info] reading returns : {args.returns}")
-    returns = read_parquet(args.returns)
+    returns = read_parquet(args.returns, columns=["meeting_id","segment_id","timestamp_utc","sym",
+                                                  "d_px_60","pre_px_60","emotion"])
 
     # Basic requirements (video_id optional)
     need_seg = {"meeting_id","segment_id","timestamp_utc","emotion"}
@@ -145,31 +197,36 @@ def main():
         sys.exit(f"[fatal] segments missing columns: {miss_seg}")
     if miss_ret:
         sys.exit(f"[fatal] returns missing columns: {miss_ret}")
+    for c in ("d_px_60", "pre_px_60"):
+        returns[c] = returns[c].astype(np.float32)
+    returns["sym"] = returns["sym"].astype("category")
 
-    # Clean labels and attach to returns if needed
-    segments["emotion"] = segments["emotion"].astype(str).str.lower().str.strip()
+    # Clean labels once into the categorical (neutral/happy/surprise/anxious);
+    # merges, filters and dummies below then work on int codes
+    segments["emotion"] = to_emotion(segments["emotion"])
     if "emotion" not in returns.columns:
-        returns = returns.merge(
-            segments[["meeting_id","segment_id","emotion"]],
-            on=["meeting_id","segment_id"], how="left", validate="m:1"
-        )
-    returns["emotion"] = returns["emotion"].astype(str).str.lower().str.strip()
+        # m:1 keyed lookup (raises if segment keys are not unique)
+        seg_emotion = segments.set_index(["meeting_id","segment_id"])["emotion"]
+        returns["emotion"] = pd.MultiIndex.from_frame(returns[["meeting_id","segment_id"]]).map(seg_emotion)
+    else:
+        returns["emotion"] = to_emotion(returns["emotion"])
 
     # Keep only allowed labels
     returns = returns[returns["emotion"].isin(args.allowed-labels if hasattr(args,'allowed-labels') else args.allowed_labels)]  # safety
     # The above line is a safety fallback; proper access:
     returns = returns[returns["emotion"].isin(args.allowed_labels)].copy()
 
-    # Build dummies: neutral is the omitted reference
-    for emo in ["happy","surprise","anxious"]:
-        col = f"emo_{emo}"
-        returns[col] = (returns["emotion"] == emo).astype(int)
+    # Build dummies once (int8): neutral is the omitted reference
+    returns = pd.concat(
+        [returns, pd.get_dummies(returns["emotion"], prefix="emo", dtype=np.int8)[EMO_TERMS]], axis=1
+    )
 
     # Winsorized dependent variable
     returns["d_px_60_w"] = winsorize(returns["d_px_60"], args.winsor_sigma)
 
     # Prepare per-asset data
     returns["meeting_id"] = returns["meeting_id"].astype(str)
+    returns["mid_code"] = pd.factorize(returns["meeting_id"])[0].astype(np.int32)  # cluster ids, hashed once
     assets = []
     for sym in ("ES","ZT"):
         d = returns[returns["sym"] == sym].dropna(subset=["d_px_60_w","pre_px_60"]).copy()
@@ -187,7 +244,7 @@ def main():
 
     # For each asset, estimate:
     # (1) no FE: y ~ happy + surprise + anxious + pre_px_60
-    # (2) FE:    y ~ happy + surprise + anxious + pre_px_60 + C(meeting_id)
+    # (2) FE:    y ~ happy + surprise + anxious + pre_px_60 + meeting FE (demeaned)
     for sym, d in assets:
         # counts by emotion
         counts = d["emotion"].value_counts().reindex(["neutral","happy","surprise","anxious"], fill_value=0)
@@ -204,7 +261,7 @@ def main():
         # ---- (1) no FE ----
         formula_noFE = "d_px_60_w ~ emo_happy + emo_surprise + emo_anxious + pre_px_60"
         fit_noFE = smf.ols(formula_noFE, data=d).fit(
-            cov_type="cluster", cov_kwds={"groups": d["meeting_id"]}
+            cov_type="cluster", cov_kwds={"groups": d["mid_code"].to_numpy()}
         )
         tidy_rows.append(tidy_coefs(fit_noFE, "per_emotion_60s", sym, "noFE", d["meetings_used"].iloc[0]))
 
@@ -216,24 +273,23 @@ def main():
         lines.append(ftest_str(fit_noFE, "emo_happy = emo_surprise", "Happy = Surprise"))
 
         # ---- (2) meeting FE ----
-        formula_FE = "d_px_60_w ~ emo_happy + emo_surprise + emo_anxious + pre_px_60 + C(meeting_id)"
-        fit_FE = smf.ols(formula_FE, data=d).fit(
-            cov_type="cluster", cov_kwds={"groups": d["meeting_id"]}
-        )
-        tidy_rows.append(tidy_coefs(fit_FE, "per_emotion_60s", sym, "FE", d["meetings_used"].iloc[0]))
+        fit_FE, r2_FE = fit_meeting_fe(d, "d_px_60_w", EMO_TERMS + ["pre_px_60"])
+        tidy_rows.append(tidy_coefs(fit_FE, "per_emotion_60s", sym, "FE", d["meetings_used"].iloc[0], r2=r2_FE))
 
-        lines.append("\n[with meeting FE] Model:")
+        lines.append("\n[with meeting FE] Model (within-meeting demeaned; R² of full FE model = "
+                     f"{r2_FE:.3f}):")
         lines.append(fit_FE.summary().as_text())
         lines.append(ftest_str(fit_FE, "emo_happy = emo_surprise = emo_anxious = 0", "Joint test (all emotion β = 0)"))
         lines.append(ftest_str(fit_FE, "emo_happy = emo_anxious", "Happy = Anxious"))
         lines.append(ftest_str(fit_FE, "emo_surprise = emo_anxious", "Surprise = Anxious"))
         lines.append(ftest_str(fit_FE, "emo_happy = emo_surprise", "Happy = Surprise"))
 
-    # Write tidy coefficients
+    # Write tidy coefficients: Parquet (full precision) + compact CSV for reading
     tidy_df = pd.concat(tidy_rows, ignore_index=True)
     tidy_path = results_dir / "per_emotion_60s_tidy.csv"
-    tidy_df.to_csv(tidy_path, index=False)
-    print(f"[write] {tidy_path}")
+    tidy_df.to_parquet(tidy_path.with_suffix(".parquet"), index=False)
+    tidy_df.to_csv(tidy_path, index=False, float_format="%.6g")
+    print(f"[write] {tidy_path} (+ .parquet)")
 
     # Write counts used
     cnt_rows = []
@@ -5,8 +5,9 @@ Clip-level per-emotion regressions including ZQ (Fed fund futures) surprise.
 
 Two specs per asset (ES, ZT):
   (A) No meeting FE:  d_px_60_w ~ emotions + pre_px_60 + ZQ_surprise
-  (B) With meeting FE: d_px_60_w ~ emotions + pre_px_60 + C(meeting_id)
-      (Note: ZQ_surprise drops here by construction, it's meeting-constant.)
+  (B) With meeting FE: d_px_60_w ~ emotions + pre_px_60 + meeting FE
+      (FE absorbed by within-meeting demeaning; same slopes/SEs as C(meeting_id).
+       ZQ_surprise drops here by construction, it's meeting-constant.)
 
 Inputs (read-only):
   - s3://fomcthesiss3/analysis/segments.parquet
@@ -14,7 +15,8 @@ Inputs (read-only):
   - /home/ubuntu/reg_outputs/results/zq_surprises.csv  (from build_zq_surprise.py)
 
 Outputs (local):
-  - /home/ubuntu/reg_outputs/results/per_emotion_60s_with_zq.csv
+  - /home/ubuntu/reg_outputs/results/per_emotion_60s_with_zq.csv      (%.6g)
+  - /home/ubuntu/reg_outputs/results/per_emotion_60s_with_zq.parquet  (full precision)
   - /home/ubuntu/reg_outputs/results/per_emotion_60s_with_zq.txt
 """
 
@@ -22,7 +24,11 @@ import os, sys, json
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
+import statsmodels.api as sm
 import statsmodels.formula.api as smf
+from statsmodels.regression.linear_model import OLSResults, RegressionResultsWrapper
+from statsmodels.stats.sandwich_covariance import cov_cluster
 
 try:
     import s3fs
@@ -43,21 +49,64 @@ OUT_TXT     = OUT_DIR / "per_emotion_60s_with_zq.txt"
 
 W_SIGMA     = 3.0     # winsor cap (sigma)
 ASSETS      = ["ES", "ZT"]
+EMOTIONS    = pd.CategoricalDtype(["neutral", "happy", "surprise", "anxious"])
+EMO_TERMS   = ["emo_happy", "emo_surprise", "emo_anxious"]   # neutral omitted
 # ----------------------------------------
 
 
-def _read_pq(s3_key: str) -> pd.DataFrame:
+def to_emotion(s: pd.Series) -> pd.Categorical:
+    """Lower-case/strip labels into EMOTIONS; anything else (incl. missing) → NaN."""
+    labels = s.astype(str).str.lower().str.strip()
+    return pd.Categorical.from_codes(EMOTIONS.categories.get_indexer(labels), dtype=EMOTIONS)
+
+def _read_pq(s3_key: str, columns=None) -> pd.DataFrame:
+    """Read only the listed columns that exist in the file (None = all)."""
     uri = f"s3://{BUCKET}/{s3_key}"
     print(f"[info] reading {s3_key.split('/')[-1]}: {uri}")
+    if columns is not None:
+        if FS is None:
+            names = set(pq.read_schema(uri).names)
+        else:
+            with FS.open(uri, "rb") as f:
+                names = set(pq.read_schema(f).names)
+        columns = [c for c in columns if c in names]
     if FS is None:
-        return pd.read_parquet(uri)  # assumes mounted
-    return pd.read_parquet(uri, filesystem=FS)
+        return pd.read_parquet(uri, columns=columns)  # assumes mounted
+    return pd.read_parquet(uri, columns=columns, filesystem=FS)
 
 def winsor(s: pd.Series, sigma=W_SIGMA) -> pd.Series:
     cap = sigma * s.std(skipna=True)
     return s.clip(-cap, cap)
 
-def tidy_from_fit(fit, model_name: str, asset: str) -> pd.DataFrame:
+def fit_meeting_fe(d: pd.DataFrame, y: str, exog: list):
+    """y ~ exog + meeting FE via within-meeting demeaning (FWL), clustered by meeting.
+
+    The intercept + M-1 meeting dummies are absorbed, so df_resid = n-k-M and the
+    cluster covariance carries the dummy model's factor G/(G-1)·(n-1)/(n-k-M):
+    slopes, SEs and F-tests equal the C(meeting_id) fit (normal p-values, G-1
+    denominator df, as statsmodels' cluster default). Returns (fit, r2) with r2
+    the R² of the full FE model; the fit's own R² is the within R².
+    """
+    cols = [y] + exog
+    x = d[cols].astype(np.float64)
+    g = d["mid_code"].to_numpy()
+    dm = x - x.groupby(g, sort=False).transform("mean")
+    n, k, m = len(d), len(exog), len(np.unique(g))
+
+    model = sm.OLS(dm[y], dm[exog])
+    model.df_resid = n - k - m
+    ols = model.fit()
+    cov = cov_cluster(ols, g, use_correction=False) * (m / (m - 1) * (n - 1) / (n - k - m))
+    res = OLSResults(model, ols.params.to_numpy(), ols.normalized_cov_params, use_t=False,
+                     cov_params_default=cov, df_resid_inference=m - 1)
+    res.cov_type = "cluster"
+    res.cov_kwds = {"description": "Standard Errors are robust to cluster correlation "
+                                   "(meeting); meeting FE absorbed by demeaning"}
+    fit = RegressionResultsWrapper(res)
+    r2 = 1.0 - fit.ssr / float(((x[y] - x[y].mean()) ** 2).sum())
+    return fit, r2
+
+def tidy_from_fit(fit, model_name: str, asset: str, r2: float = None) -> pd.DataFrame:
     """Return tidy coef table with meta columns."""
     df = (
         fit.params.to_frame("coef")
@@ -69,39 +118,47 @@ def tidy_from_fit(fit, model_name: str, asset: str) -> pd.DataFrame:
     df["model"]      = model_name
     df["asset"]      = asset
     df["nobs"]       = int(fit.nobs)
-    df["r2"]         = float(getattr(fit, "rsquared", np.nan))
+    df["r2"]         = float(getattr(fit, "rsquared", np.nan) if r2 is None else r2)
     return df[["asset","model","term","coef","se","pval","nobs","r2"]]
 
 def main():
     # ---------- load core data ----------
-    segments = _read_pq(SEG_KEY)[["meeting_id","video_id","segment_id","emotion"]]
-    segments["emotion"] = segments["emotion"].str.lower()
+    segments = _read_pq(SEG_KEY, columns=["meeting_id","video_id","segment_id","emotion"])
+    segments["emotion"] = to_emotion(segments["emotion"])
 
-    returns = _read_pq(RET_KEY)
+    returns = _read_pq(RET_KEY, columns=["meeting_id","video_id","segment_id","sym",
+                                         "d_px_60","pre_px_60","emotion"])
     # merge emotion if missing
     if "emotion" not in returns.columns:
         on_cols = [c for c in ["meeting_id","video_id","segment_id"] if c in returns.columns]
         if "video_id" not in on_cols and "segment_id" in on_cols:
             # common fallback when video_id not present
             on_cols = ["meeting_id","segment_id"]
-        returns = returns.merge(
-            segments, on=on_cols, how="left", validate="one_to_one"
-        )
+        # keyed lookup instead of a join (raises if segment keys are not unique)
+        seg_emotion = segments.set_index(on_cols)["emotion"]
+        returns["emotion"] = pd.MultiIndex.from_frame(returns[on_cols]).map(seg_emotion)
+    else:
+        returns["emotion"] = to_emotion(returns["emotion"])
 
     # sanity
     needed = {"meeting_id","sym","d_px_60","pre_px_60","emotion"}
     missing = needed - set(returns.columns)
     if missing:
         sys.exit(f"[error] returns missing columns: {missing}")
+    for c in ("d_px_60", "pre_px_60"):
+        returns[c] = returns[c].astype(np.float32)
+    returns["sym"] = returns["sym"].astype("category")
+
+    # cluster ids: hash meeting_id strings once, not on every fit
+    returns["mid_code"] = pd.factorize(returns["meeting_id"])[0].astype(np.int32)
 
     # ---------- winsorize y ----------
     returns["d_px_60_w"] = winsor(returns["d_px_60"])
 
     # ---------- emotion dummies ----------
-    emo = returns["emotion"].astype(str).str.lower()
-    returns["emo_happy"]    = (emo == "happy").astype(int)
-    returns["emo_surprise"] = (emo == "surprise").astype(int)
-    returns["emo_anxious"]  = (emo == "anxious").astype(int)
+    returns = pd.concat(
+        [returns, pd.get_dummies(returns["emotion"], prefix="emo", dtype=np.int8)[EMO_TERMS]], axis=1
+    )
     # neutral is omitted baseline
 
     # ---------- ZQ surprises ----------
@@ -114,9 +171,11 @@ def main():
     if "target_surprise_bps" not in zq.columns:
         sys.exit("[error] zq_surprises.csv missing 'target_surprise_bps'")
 
-    zq = zq[["meeting_id","target_surprise_bps"]].copy()
-
-    df = returns.merge(zq, on="meeting_id", how="left")
+    # tiny meeting_id → bps table: dict lookup instead of a merge (float32 is plenty)
+    zq_map = dict(zip(zq["meeting_id"].astype(str), zq["target_surprise_bps"].astype(np.float32)))
+    df = returns.assign(
+        target_surprise_bps=returns["meeting_id"].astype(str).map(zq_map).astype(np.float32)
+    )
     # -------------------------------
 
     all_tidy = []
@@ -128,20 +187,19 @@ def main():
         for asset in ASSETS:
             sub = df.loc[df["sym"] == asset].copy()
 
-            # Spec (A): no FE, include ZQ
-            cols_a = [
-                "d_px_60_w","pre_px_60","meeting_id",
+            # one NaN scan per asset: spec B's rows, spec A additionally needs ZQ
+            cols_b = [
+                "d_px_60_w","pre_px_60","meeting_id","mid_code",
                 "emo_happy","emo_surprise","emo_anxious",
-                "target_surprise_bps",
             ]
-            A = sub[cols_a].dropna().copy()
+            ok_b = sub[cols_b].notna().all(axis=1)
+            ok_a = ok_b & sub["target_surprise_bps"].notna()
+
+            # Spec (A): no FE, include ZQ
+            A = sub.loc[ok_a, cols_b + ["target_surprise_bps"]]
 
             # Spec (B): meeting FE, exclude ZQ (collinear with FE)
-            cols_b = [
-                "d_px_60_w","pre_px_60","meeting_id",
-                "emo_happy","emo_surprise","emo_anxious",
-            ]
-            B = sub[cols_b].dropna().copy()
+            B = sub.loc[ok_b, cols_b]
 
             # Quick diagnostics
             fh.write(f"=== {asset} ===\n")
@@ -156,10 +214,10 @@ def main():
             else:
                 model_a = smf.ols(
                     "d_px_60_w ~ emo_happy + emo_surprise + emo_anxious + pre_px_60 + target_surprise_bps",
-                    data=A
+                    data=A, missing="none"
                 ).fit(
                     cov_type="cluster",
-                    cov_kwds={"groups": A["meeting_id"]}
+                    cov_kwds={"groups": A["mid_code"].to_numpy()}
                 )
                 fh.write("\n[A] No FE + ZQ surprise\n")
                 fh.write(str(model_a.summary()))
@@ -171,25 +229,21 @@ def main():
             if len(B) == 0 or B["meeting_id"].nunique() < 2:
                 fh.write("[warn] insufficient rows or clusters for spec B\n\n")
             else:
-                model_b = smf.ols(
-                    "d_px_60_w ~ emo_happy + emo_surprise + emo_anxious + pre_px_60 + C(meeting_id)",
-                    data=B
-                ).fit(
-                    cov_type="cluster",
-                    cov_kwds={"groups": B["meeting_id"]}
-                )
-                fh.write("\n[B] With meeting FE (ZQ excluded)\n")
+                model_b, r2_b = fit_meeting_fe(B, "d_px_60_w", EMO_TERMS + ["pre_px_60"])
+                fh.write(f"\n[B] With meeting FE (ZQ excluded; within-meeting demeaned, "
+                         f"R² of full FE model = {r2_b:.3f})\n")
                 fh.write(str(model_b.summary()))
                 fh.write("\n")
-                tidy_b = tidy_from_fit(model_b, "FE_no_ZQ", asset)
+                tidy_b = tidy_from_fit(model_b, "FE_no_ZQ", asset, r2=r2_b)
                 all_tidy.append(tidy_b)
 
             fh.write("\n")
 
     if all_tidy:
         out = pd.concat(all_tidy, ignore_index=True)
-        out.to_csv(OUT_CSV, index=False)
-        print(f"[write] {OUT_CSV}")
+        out.to_parquet(Path(OUT_CSV).with_suffix(".parquet"), index=False)
+        out.to_csv(OUT_CSV, index=False, float_format="%.6g")
+        print(f"[write] {OUT_CSV} (+ .parquet)")
     print(f"[write] {OUT_TXT}")
     print("\n[done] Regressions with ZQ surprise completed.")
 